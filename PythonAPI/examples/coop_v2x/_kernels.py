@@ -0,0 +1,52 @@
+"""
+Numeric kernels for the per-tick intersection geometry.
+- Uses numba when it is installed; otherwise falls back to equivalent NumPy code.
+- Kernels only see flat float/bool arrays; dict-based tracking state stays in Python.
+
+classify(locs, cx, cy, cz, r2, r2_exit, bh) takes an (N, 3) location array and returns
+(in_approach, in_box, past_exit) boolean masks against squared radii `r2`/`r2_exit` and
+box half-extent `bh` around the center (cx, cy, cz).
+"""
+
+from typing import Tuple
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+def _classify_numpy(
+    locs: np.ndarray, cx: float, cy: float, cz: float, r2: float, r2_exit: float, bh: float
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    dx = locs[:, 0] - cx
+    dy = locs[:, 1] - cy
+    dz = locs[:, 2] - cz
+    d2 = dx * dx + dy * dy + dz * dz
+    in_box = (np.abs(dx) <= bh) & (np.abs(dy) <= bh)
+    return d2 <= r2, in_box, d2 > r2_exit
+
+
+if numba is not None:
+
+    @numba.njit(cache=True, fastmath=True)
+    def _classify_jit(locs, cx, cy, cz, r2, r2_exit, bh):
+        n = locs.shape[0]
+        in_approach = np.empty(n, dtype=np.bool_)
+        in_box = np.empty(n, dtype=np.bool_)
+        past_exit = np.empty(n, dtype=np.bool_)
+        for i in range(n):
+            dx = locs[i, 0] - cx
+            dy = locs[i, 1] - cy
+            dz = locs[i, 2] - cz
+            d2 = dx * dx + dy * dy + dz * dz
+            in_approach[i] = d2 <= r2
+            in_box[i] = abs(dx) <= bh and abs(dy) <= bh
+            past_exit[i] = d2 > r2_exit
+        return in_approach, in_box, past_exit
+
+    classify = _classify_jit
+else:
+    classify = _classify_numpy
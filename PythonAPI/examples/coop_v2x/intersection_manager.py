@@ -1,14 +1,18 @@
 from __future__ import annotations
 
+import heapq
+import itertools
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import AbstractSet, Dict, List, Optional, Sequence, Set, Tuple
 
 import carla
+import numpy as np
 
+from _kernels import classify
 from vehicle_agent import VehicleAgent
 
 
-@dataclass
+@dataclass(slots=True)
 class VehicleState:
     vehicle_id: int
     arrival_time: float
@@ -20,11 +24,97 @@ class VehicleState:
     exported: bool = False
 
 
+def _opt(value: float) -> Optional[float]:
+    return None if np.isnan(value) else float(value)
+
+
+class IntersectionStates:
+    """
+    Per-vehicle tracking state stored as parallel arrays (one row per tracked vehicle).
+    - Rows stay in arrival order; `rows` maps vehicle id -> row index.
+    - Unset timestamps are NaN.
+    - VehicleState objects are only built when exporting completed vehicles.
+    """
+
+    _FIELDS = (
+        "vids",
+        "arrival_time",
+        "permission_time",
+        "enter_time",
+        "exit_time",
+        "in_box",
+        "cleared",
+        "exported",
+    )
+
+    def __init__(self, capacity: int = 16):
+        self.rows: Dict[int, int] = {}
+        self.size = 0
+        self.vids = np.zeros(capacity, dtype=np.int64)
+        self.arrival_time = np.full(capacity, np.nan)
+        self.permission_time = np.full(capacity, np.nan)
+        self.enter_time = np.full(capacity, np.nan)
+        self.exit_time = np.full(capacity, np.nan)
+        self.in_box = np.zeros(capacity, dtype=bool)
+        self.cleared = np.zeros(capacity, dtype=bool)
+        self.exported = np.zeros(capacity, dtype=bool)
+
+    def add(self, vid: int, arrival_time: float) -> int:
+        if self.size == self.vids.shape[0]:
+            self._grow(max(2 * self.size, 16))
+        row = self.size
+        self.vids[row] = vid
+        self.arrival_time[row] = arrival_time
+        self.permission_time[row] = np.nan
+        self.enter_time[row] = np.nan
+        self.exit_time[row] = np.nan
+        self.in_box[row] = False
+        self.cleared[row] = False
+        self.exported[row] = False
+        self.rows[vid] = row
+        self.size += 1
+        return row
+
+    def remove(self, vids: Sequence[int]):
+        if not vids:
+            return
+        keep = np.ones(self.size, dtype=bool)
+        for vid in vids:
+            keep[self.rows[vid]] = False
+        # Compact in place so the remaining rows keep their arrival order.
+        kept = int(keep.sum())
+        for name in self._FIELDS:
+            arr = getattr(self, name)
+            arr[:kept] = arr[:self.size][keep]
+        self.size = kept
+        self.rows = {int(vid): row for row, vid in enumerate(self.vids[:kept])}
+
+    def to_state(self, row: int) -> VehicleState:
+        return VehicleState(
+            vehicle_id=int(self.vids[row]),
+            arrival_time=float(self.arrival_time[row]),
+            in_box=bool(self.in_box[row]),
+            cleared=bool(self.cleared[row]),
+            permission_time=_opt(self.permission_time[row]),
+            enter_time=_opt(self.enter_time[row]),
+            exit_time=_opt(self.exit_time[row]),
+            exported=bool(self.exported[row]),
+        )
+
+    def _grow(self, capacity: int):
+        for name in self._FIELDS:
+            arr = getattr(self, name)
+            # Rows past `size` are fully initialised by add(), so no fill is needed.
+            grown = np.empty(capacity, dtype=arr.dtype)
+            grown[:self.size] = arr[:self.size]
+            setattr(self, name, grown)
+
+
 class IntersectionManager:
     """
     Minimal FCFS intersection manager.
     - Tracks vehicles entering an approach radius.
-    - Grants permission to one vehicle at a time.
+    - Grants permission to up to `max_active` vehicles at a time (one by default).
     - Clears permission after the vehicle passes the intersection box.
     """
 
@@ -38,73 +128,122 @@ class IntersectionManager:
         self.center = center
         self.approach_radius = approach_radius
         self.box_half_extent = box_half_extent
-        self._states: Dict[int, VehicleState] = {}
+        self._states = IntersectionStates()
+        # FCFS order lives in the list; the set mirrors it for O(1) membership tests.
         self._active_ids: List[int] = []
+        self._active_set: Set[int] = set()
+        # Min-heap of (arrival_time, seq, vid) for vehicles not yet granted; seq keeps ties in arrival order.
+        self._arrival_heap: List[Tuple[float, int, int]] = []
+        self._arrival_seq = itertools.count()
+        # Vehicle ids that cleared the box since the last poll_completed().
+        self._pending_export: List[int] = []
         self._max_active = max(1, max_active)
+        # Plain-float copies of the center/box so the tick loop never touches carla.Location.
+        self._cx = float(center.x)
+        self._cy = float(center.y)
+        self._cz = float(center.z)
+        self._box_h = float(box_half_extent)
+        # Squared thresholds so distance checks never need a sqrt.
+        self._r2 = float(approach_radius) ** 2
+        self._r2_exit = (float(approach_radius) * 0.75) ** 2
+        # Per-tick location buffer (one row per agent), resized on demand.
+        self._loc_buf = np.empty((0, 3), dtype=np.float64)
 
-    def update(self, agents: List[VehicleAgent], timestamp: float):
-        # Register arrivals.
-        for agent in agents:
-            vid = agent.vehicle.id
-            dist = agent.distance_to(self.center)
-            state = self._states.get(vid)
-            if dist <= self.approach_radius and state is None:
-                self._states[vid] = VehicleState(vehicle_id=vid, arrival_time=timestamp)
+    def update(
+        self,
+        agents: List[VehicleAgent],
+        timestamp: float,
+        locations: Optional[Sequence[Tuple[float, float, float]]] = None,
+        snapshot: Optional[carla.WorldSnapshot] = None,
+    ):
+        # Gather all agent locations into one array so the geometry is a single kernel call.
+        # `locations` lets the caller share positions it already sampled this tick; otherwise
+        # they are read from `snapshot` (or the actors themselves when no snapshot is given).
+        n = len(agents)
+        if self._loc_buf.shape[0] != n:
+            self._loc_buf = np.empty((n, 3), dtype=np.float64)
+        locs = self._loc_buf
+        if locations is None:
+            locations = [agent.get_xyz(snapshot) for agent in agents]
+        for i, xyz in enumerate(locations):
+            locs[i] = xyz
+        # Axis-aligned box around center. Adjust for your target junction geometry if needed.
+        in_approach, in_box_mask, past_exit = classify(
+            locs, self._cx, self._cy, self._cz, self._r2, self._r2_exit, self._box_h
+        )
 
         # Drop cleared/removed vehicles from tracking.
-        dead_ids = [vid for vid in self._states if not any(a.vehicle.id == vid for a in agents)]
+        st = self._states
+        live_ids = {a.id for a in agents}
+        dead_ids = [vid for vid in st.rows if vid not in live_ids]
+        st.remove(dead_ids)
         for vid in dead_ids:
-            self._states.pop(vid, None)
-            if vid in self._active_ids:
-                self._active_ids.remove(vid)
-
-        # Update in_box flags and clear exiting vehicles.
-        for agent in agents:
-            vid = agent.vehicle.id
-            state = self._states.get(vid)
-            if state is None:
+            self._release(vid)
+
+        # Register arrivals.
+        agent_rows = np.empty(n, dtype=np.int64)
+        for i, (agent, approaching) in enumerate(zip(agents, in_approach)):
+            vid = agent.id
+            row = st.rows.get(vid)
+            if row is None:
+                if approaching:
+                    row = st.add(vid, timestamp)
+                    heapq.heappush(self._arrival_heap, (timestamp, next(self._arrival_seq), vid))
+                else:
+                    row = -1
+            agent_rows[i] = row
+
+        # Update in_box flags and clear exiting vehicles, as bulk mask ops over tracked rows.
+        tracked = agent_rows >= 0
+        rows = agent_rows[tracked]
+        in_box_now = in_box_mask[tracked]
+        newly_in = in_box_now & ~st.in_box[rows]
+        st.in_box[rows[newly_in]] = True
+        enter_rows = rows[newly_in]
+        enter_rows = enter_rows[np.isnan(st.enter_time[enter_rows])]
+        st.enter_time[enter_rows] = timestamp
+
+        exit_rows = rows[st.in_box[rows] & ~in_box_now & past_exit[tracked]]
+        self._pending_export.extend(st.vids[exit_rows[~st.cleared[exit_rows]]].tolist())
+        st.cleared[exit_rows] = True
+        unset_exit = exit_rows[np.isnan(st.exit_time[exit_rows])]
+        st.exit_time[unset_exit] = timestamp
+        for vid in st.vids[exit_rows].tolist():
+            self._release(vid)
+
+        # Assign permissions up to the allowed active count, in arrival order.
+        # Entries for vehicles that cleared or left before being granted are discarded as they surface.
+        heap = self._arrival_heap
+        while heap and len(self._active_ids) < self._max_active:
+            _, _, vid = heapq.heappop(heap)
+            row = st.rows.get(vid)
+            if row is None or st.cleared[row] or vid in self._active_set:
                 continue
-            in_box = self._is_in_box(agent.vehicle.get_location())
-            if in_box and not state.in_box:
-                state.in_box = True
-                if state.enter_time is None:
-                    state.enter_time = timestamp
-            if state.in_box and not in_box and dist > self.approach_radius * 0.75:
-                state.cleared = True
-                if state.exit_time is None:
-                    state.exit_time = timestamp
-                if vid in self._active_ids:
-                    self._active_ids.remove(vid)
-
-        # Assign permissions up to the allowed active count.
-        waiting = [
-            (vid, st.arrival_time)
-            for vid, st in self._states.items()
-            if not st.cleared and vid not in self._active_ids
-        ]
-        waiting.sort(key=lambda item: item[1])
-        for vid, _ in waiting:
-            if len(self._active_ids) >= self._max_active:
-                break
             self._active_ids.append(vid)
-            state = self._states.get(vid)
-            if state and state.permission_time is None:
-                state.permission_time = timestamp
+            self._active_set.add(vid)
+            if np.isnan(st.permission_time[row]):
+                st.permission_time[row] = timestamp
 
     def current_permissions(self) -> Dict[int, bool]:
         return {vid: True for vid in self._active_ids}
 
+    def active_ids(self) -> AbstractSet[int]:
+        # Live view of the vehicles holding permission; avoids building a dict every tick.
+        return self._active_set
+
     def poll_completed(self) -> List[VehicleState]:
+        st = self._states
+        pending, self._pending_export = self._pending_export, []
         finished: List[VehicleState] = []
-        for vid, state in self._states.items():
-            if state.cleared and not state.exported:
-                finished.append(state)
-                state.exported = True
+        for vid in pending:
+            row = st.rows.get(vid)
+            if row is None:
+                continue
+            st.exported[row] = True
+            finished.append(st.to_state(row))
         return finished
 
-    def _is_in_box(self, location: carla.Location) -> bool:
-        # Axis-aligned box around center. Adjust for your target junction geometry if needed.
-        return (
-            abs(location.x - self.center.x) <= self.box_half_extent and
-            abs(location.y - self.center.y) <= self.box_half_extent
-        )
+    def _release(self, vid: int):
+        if vid in self._active_set:
+            self._active_set.remove(vid)
+            self._active_ids.remove(vid)
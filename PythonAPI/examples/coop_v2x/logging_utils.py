@@ -6,32 +6,29 @@ from intersection_manager import VehicleState
 
 
 class MetricsLogger:
-    def __init__(self, path: str):
+    def __init__(self, path: str, flush_every: int = 64):
         self.path = Path(path)
         self.file = self.path.open("w", newline="")
-        self.writer = csv.DictWriter(
-            self.file,
-            fieldnames=[
-                "vehicle_id",
-                "arrival_time",
-                "permission_time",
-                "enter_time",
-                "exit_time",
-            ],
-        )
-        self.writer.writeheader()
+        # Flush in batches rather than per row; close() flushes whatever remains.
+        self.flush_every = max(1, flush_every)
+        self._pending_rows = 0
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(("vehicle_id", "arrival_time", "permission_time", "enter_time", "exit_time"))
 
     def log_state(self, state: VehicleState):
         self.writer.writerow(
-            {
-                "vehicle_id": state.vehicle_id,
-                "arrival_time": state.arrival_time,
-                "permission_time": state.permission_time,
-                "enter_time": state.enter_time,
-                "exit_time": state.exit_time,
-            }
+            (
+                state.vehicle_id,
+                state.arrival_time,
+                state.permission_time,
+                state.enter_time,
+                state.exit_time,
+            )
         )
-        self.file.flush()
+        self._pending_rows += 1
+        if self._pending_rows >= self.flush_every:
+            self.file.flush()
+            self._pending_rows = 0
 
     def close(self):
         self.file.close()
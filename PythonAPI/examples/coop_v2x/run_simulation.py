@@ -1,10 +1,10 @@
 import argparse
 import math
 import random
-import time
 from typing import List, Optional
 
 import carla
+import numpy as np
 from agents.navigation.global_route_planner import GlobalRoutePlanner
 
 from intersection_manager import IntersectionManager, VehicleState
@@ -49,9 +49,9 @@ def spawn_vehicles(world: carla.World, count: int, spawn_indices: Optional[List[
             except IndexError as exc:
                 raise ValueError(f"Spawn index {idx} is out of range (total {len(spawn_points)})") from exc
 
+    chosen_bps = random.choices(bp_candidates, k=count)
     vehicles = []
-    for i in range(count):
-        blueprint = random.choice(bp_candidates)
+    for i, blueprint in enumerate(chosen_bps):
         blueprint.set_attribute("role_name", f"ego_{i}")
         vehicle = world.spawn_actor(blueprint, selected_points[i])
         vehicle.set_autopilot(False)
@@ -84,16 +84,11 @@ def require_indices(raw: Optional[str], label: str, required: int, total_availab
 
 
 def average_location(points: List[carla.Transform]) -> carla.Location:
-    loc = carla.Location()
-    for t in points:
-        loc.x += t.location.x
-        loc.y += t.location.y
-        loc.z += t.location.z
-    n = max(len(points), 1)
-    loc.x /= n
-    loc.y /= n
-    loc.z /= n
-    return loc
+    if not points:
+        return carla.Location()
+    coords = np.array([(t.location.x, t.location.y, t.location.z) for t in points], dtype=np.float64)
+    mx, my, mz = coords.mean(axis=0)
+    return carla.Location(x=float(mx), y=float(my), z=float(mz))
 
 
 def main():
@@ -219,16 +214,18 @@ def main():
         start_sim_time: Optional[float] = None
         while True:
             world.tick()
-            timestamp = world.get_snapshot().timestamp.elapsed_seconds
+            snapshot = world.get_snapshot()
+            timestamp = snapshot.timestamp.elapsed_seconds
             if start_sim_time is None:
                 start_sim_time = timestamp
 
-            manager.update(agents, timestamp)
-            permissions = manager.current_permissions()
+            # Sample each vehicle's location once and share it with the manager and the agents.
+            locations = [agent.get_xyz(snapshot) for agent in agents]
+            manager.update(agents, timestamp, locations)
+            active = manager.active_ids()
 
-            for agent in agents:
-                go = permissions.get(agent.vehicle.id, False)
-                agent.step(go)
+            for agent, xyz in zip(agents, locations):
+                agent.step(agent.id in active, agent.distance_to_stop(xyz))
 
             # Log any vehicles that have cleared the box.
             if logger is not None:
@@ -239,7 +236,6 @@ def main():
             # Basic exit after 2 simulated minutes to avoid runaway runs.
             if start_sim_time is not None and (timestamp - start_sim_time) > 120:
                 break
-            time.sleep(0.001)
     except KeyboardInterrupt:
         pass
     finally:
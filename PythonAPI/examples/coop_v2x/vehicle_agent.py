@@ -1,6 +1,7 @@
 from __future__ import annotations
 
-from typing import Optional
+import math
+from typing import Optional, Tuple
 
 import carla
 from agents.navigation.basic_agent import BasicAgent
@@ -21,9 +22,14 @@ class VehicleAgent:
         stop_radius: float,
         route_planner: Optional[GlobalRoutePlanner] = None,
     ):
+        if destination is None:
+            raise ValueError("VehicleAgent requires a destination; pass one of the caller's spawn points")
         self.world = world
         self.vehicle = vehicle
+        # Cached once: vehicle.id is a binding property lookup on every access.
+        self.id = int(vehicle.id)
         self.stop_location = stop_location
+        self._stop_xyz = (float(stop_location.x), float(stop_location.y), float(stop_location.z))
         self.stop_radius = stop_radius
         opt_dict = {
             "target_speed": target_speed_kmh,
@@ -39,8 +45,10 @@ class VehicleAgent:
         )
         self.agent.set_destination(destination, start_location=start_location, clean_queue=True)
 
-    def step(self, permission_to_go: bool):
-        distance_to_stop = self.distance_to(self.stop_location)
+    def step(self, permission_to_go: bool, distance_to_stop: Optional[float] = None):
+        # Callers that already sampled this tick's location pass the distance in to skip another query.
+        if distance_to_stop is None:
+            distance_to_stop = self.distance_to(self.stop_location)
         if not permission_to_go and distance_to_stop <= self.stop_radius:
             control = carla.VehicleControl(throttle=0.0, brake=1.0)
         else:
@@ -50,6 +58,22 @@ class VehicleAgent:
     def distance_to(self, location: carla.Location) -> float:
         return self.vehicle.get_location().distance(location)
 
+    def get_xyz(self, snapshot: Optional[carla.WorldSnapshot] = None) -> Tuple[float, float, float]:
+        # Prefer the tick's world snapshot (local lookup) over querying the actor.
+        actor_snap = snapshot.find(self.id) if snapshot is not None else None
+        if actor_snap is not None:
+            loc = actor_snap.get_transform().location
+        else:
+            loc = self.vehicle.get_location()
+        return loc.x, loc.y, loc.z
+
+    def distance_to_stop(self, xyz: Tuple[float, float, float]) -> float:
+        sx, sy, sz = self._stop_xyz
+        dx = xyz[0] - sx
+        dy = xyz[1] - sy
+        dz = xyz[2] - sz
+        return math.sqrt(dx * dx + dy * dy + dz * dz)
+
     @property
     def is_alive(self) -> bool:
         return self.vehicle.is_alive